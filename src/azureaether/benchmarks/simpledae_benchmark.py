@@ -0,0 +1,259 @@
+"""
+Offline benchmark of SimpleDae trigger cycles against a simulated DAE.
+
+Run with e.g. ``python -m azureaether.benchmarks.simpledae_benchmark --spectra 1 100 1000``.
+"""
+
+import argparse
+import asyncio
+import itertools
+import math
+import statistics
+import time
+import tracemalloc
+from collections import defaultdict
+from dataclasses import dataclass
+
+from azureaether.benchmarks.simulated_dae import SimulatedDae
+from azureaether.simpledae import (
+    MultiSpectrumReducer,
+    PeriodGoodFramesWaiter,
+    PeriodPerPointController,
+    PoissonPrecisionWaiter,
+    SimpleDae,
+    SingleSpectrumByPeriodGoodFramesReducer,
+    TofRoiReducer,
+)
+
+PREFIX = "SIM:"
+DAE_PREFIX = PREFIX + "DAE:"
+
+CONTROLLERS = {
+    "per_point": lambda points: PeriodPerPointController(save_run=False),
+}
+
+# Each simulated frame puts about spectrum_size counts in a spectrum, so the precision target is
+# set to be reached after about as many frames as the frames waiter waits for.
+WAITERS = {
+    "frames": lambda frames, spectrum_size: PeriodGoodFramesWaiter(frames=frames),
+    "precision": lambda frames, spectrum_size: PoissonPrecisionWaiter(
+        DAE_PREFIX,
+        detector_spectra=[1],
+        target_precision=1 / math.sqrt(frames * spectrum_size),
+        max_frames=10 * frames,
+        poll_interval=0.005,
+    ),
+}
+
+REDUCERS = {
+    "single": lambda num_spectra: SingleSpectrumByPeriodGoodFramesReducer(
+        dae_prefix=DAE_PREFIX, spectrum=1
+    ),
+    "tof_roi": lambda num_spectra: TofRoiReducer(
+        dae_prefix=DAE_PREFIX, spectrum=1, rois=[(0, 5000), (5000, 20000)]
+    ),
+    "multi": lambda num_spectra: MultiSpectrumReducer(
+        DAE_PREFIX,
+        detector_spectra=range(2, num_spectra + 2),
+        monitor_spectra=[1],
+    ),
+}
+
+PHASES = {
+    "controller": ("trigger_start", "trigger_end"),
+    "waiter": ("wait",),
+    "reducer": ("trigger",),
+}
+
+
+@dataclass
+class BenchmarkResult:
+    controller: str
+    waiter: str
+    reducer: str
+    pipelined: bool
+    num_spectra: int
+    points_per_second: float
+    phase_ms: dict[str, float]
+    peak_memory_mb: float
+
+
+class PhaseTimer:
+    """Records how long each wrapped strategy method takes, per call."""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+    def wrap(self, strategy, method: str, phase: str) -> None:
+        original = getattr(strategy, method)
+
+        async def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await original(*args, **kwargs)
+            finally:
+                self.samples[phase].append(time.perf_counter() - start)
+
+        setattr(strategy, method, timed)
+
+    def median_ms(self) -> dict[str, float]:
+        return {phase: 1000 * statistics.median(s) for phase, s in self.samples.items()}
+
+
+async def _simulated_dae(
+    controller: str,
+    waiter: str,
+    reducer: str,
+    num_spectra: int,
+    *,
+    pipelined: bool,
+    points: int,
+    frames: int,
+    spectrum_size: int,
+) -> SimpleDae:
+    dae = SimpleDae(
+        prefix=PREFIX,
+        name="DAE",
+        controller=CONTROLLERS[controller](points),
+        waiter=WAITERS[waiter](frames, spectrum_size),
+        reducer=REDUCERS[reducer](num_spectra),
+        pipelined=pipelined,
+    )
+    await dae.connect(mock=True)
+    await SimulatedDae(
+        dae, spectrum_size=spectrum_size, live_spectra=waiter == "precision"
+    ).install()
+    return dae
+
+
+async def _run_points(dae: SimpleDae, points: int, move_time: float) -> None:
+    # Same ordering as pipelined_scan: each point is read while moving to the next, so that a
+    # pipelined reduction has a move to overlap with.
+    await dae.stage()
+    for point in range(points):
+        move = asyncio.create_task(asyncio.sleep(move_time))
+        if point > 0:
+            await dae.read()
+        await move
+        await dae.trigger()
+    await dae.read()
+    await dae.unstage()
+
+
+async def run_benchmark(
+    controller: str,
+    waiter: str,
+    reducer: str,
+    num_spectra: int,
+    *,
+    pipelined: bool = False,
+    points: int = 20,
+    frames: int = 10,
+    spectrum_size: int = 1000,
+    move_time: float = 0.01,
+) -> BenchmarkResult:
+    def simulated_dae():
+        return _simulated_dae(
+            controller,
+            waiter,
+            reducer,
+            num_spectra,
+            pipelined=pipelined,
+            points=points,
+            frames=frames,
+            spectrum_size=spectrum_size,
+        )
+
+    dae = await simulated_dae()
+    timer = PhaseTimer()
+    for strategy_name, methods in PHASES.items():
+        strategy = getattr(dae, strategy_name)
+        for method in methods:
+            timer.wrap(strategy, method, f"{strategy_name}.{method}")
+
+    start = time.perf_counter()
+    await _run_points(dae, points, move_time)
+    elapsed = time.perf_counter() - start
+
+    # tracemalloc slows allocation down a lot, so measure memory in a separate, untimed pass.
+    dae = await simulated_dae()
+    tracemalloc.start()
+    await _run_points(dae, points, move_time)
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return BenchmarkResult(
+        controller=controller,
+        waiter=waiter,
+        reducer=reducer,
+        pipelined=pipelined,
+        num_spectra=num_spectra if reducer == "multi" else 1,
+        points_per_second=points / elapsed,
+        phase_ms=timer.median_ms(),
+        peak_memory_mb=peak_memory / 1e6,
+    )
+
+
+def format_results(results: list[BenchmarkResult]) -> str:
+    phases = sorted({phase for result in results for phase in result.phase_ms})
+    header = [
+        "controller",
+        "waiter",
+        "reducer",
+        "pipelined",
+        "spectra",
+        "points/s",
+        *phases,
+        "peak MB",
+    ]
+    rows = [
+        [
+            r.controller,
+            r.waiter,
+            r.reducer,
+            str(r.pipelined),
+            str(r.num_spectra),
+            f"{r.points_per_second:.2f}",
+            *(f"{r.phase_ms.get(phase, 0.0):.2f}" for phase in phases),
+            f"{r.peak_memory_mb:.1f}",
+        ]
+        for r in results
+    ]
+    widths = [max(len(row[i]) for row in [header, *rows]) for i in range(len(header))]
+    return "\n".join(
+        "  ".join(cell.rjust(width) for cell, width in zip(row, widths, strict=True))
+        for row in [header, *rows]
+    )
+
+
+async def main(args: argparse.Namespace) -> None:
+    results = []
+    for controller, waiter, reducer, pipelined, num_spectra in itertools.product(
+        CONTROLLERS, WAITERS, REDUCERS, (False, True), args.spectra
+    ):
+        if reducer != "multi" and num_spectra != args.spectra[0]:
+            continue  # Spectrum count only matters to the multi-spectrum reducer.
+        results.append(
+            await run_benchmark(
+                controller,
+                waiter,
+                reducer,
+                num_spectra,
+                pipelined=pipelined,
+                points=args.points,
+                frames=args.frames,
+                spectrum_size=args.spectrum_size,
+                move_time=args.move_time,
+            )
+        )
+    print(format_results(results))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--points", type=int, default=20)
+    parser.add_argument("--frames", type=int, default=10)
+    parser.add_argument("--spectrum-size", type=int, default=1000)
+    parser.add_argument("--move-time", type=float, default=0.01, help="Simulated move, seconds")
+    parser.add_argument("--spectra", type=int, nargs="+", default=[1, 100, 1000])
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,106 @@
+import asyncio
+from collections.abc import Iterator
+
+import numpy as np
+from ibex_bluesky_core.devices.dae.dae_spectra import DaeSpectra
+from ophyd_async.core import Device, callback_on_mock_put, set_mock_value
+
+from azureaether.lazy_signal import LazySignal
+from azureaether.simpledae import SimpleDae, SpectrumCounts
+
+
+def find_spectra(device: Device) -> Iterator[DaeSpectra | SpectrumCounts]:
+    """Yield every DaeSpectra or SpectrumCounts in a device tree."""
+    for _, child in device.children():
+        if isinstance(child, DaeSpectra | SpectrumCounts):
+            yield child
+        else:
+            yield from find_spectra(child)
+
+
+class SimulatedDae:
+    """
+    Makes a mock-connected SimpleDae behave enough like a real DAE to drive its strategies.
+
+    Changing period resets the frame counters, resuming the run counts frames at frame_rate until
+    the run is paused, and pausing fills every spectrum in the device tree with counts
+    proportional to the frames counted in that period. If live_spectra, the spectra are also
+    refilled as frames are counted, for waiters which watch the counts. All done through
+    ophyd-async's mock signal backends, so nothing needs to be running other than this process.
+    """
+
+    def __init__(
+        self,
+        dae: SimpleDae,
+        *,
+        spectrum_size: int = 1000,
+        frame_rate: float = 1000.0,
+        tick: float = 0.005,
+        counts_per_frame: float = 1.0,
+        live_spectra: bool = False,
+    ):
+        self._dae = dae
+        self._frame_rate = frame_rate
+        self._tick = tick
+        self._live_spectra = live_spectra
+        self._spectra = list(find_spectra(dae))
+        self._frames = 0
+        self._counting: asyncio.Task | None = None
+
+        rng = np.random.default_rng(seed=0)
+        self._counts_per_frame = (
+            rng.random(spectrum_size, dtype=np.float32) * 2 * counts_per_frame
+        ).astype(np.float32)
+        self._tof = np.linspace(0, 20000, spectrum_size, dtype=np.float32)
+
+    async def install(self) -> None:
+        dae = self._dae
+        callback_on_mock_put(dae.period_num, self._on_period_change)
+        callback_on_mock_put(dae.controls.resume_run, self._on_resume)
+        callback_on_mock_put(dae.controls.pause_run, self._on_pause)
+        for spectrum in self._spectra:
+            set_mock_value(await self._mock_connected(spectrum.tof), self._tof)
+            set_mock_value(await self._mock_connected(spectrum.tof_size), self._tof.shape[0])
+        self._set_frames(0)
+        self._fill_spectra()
+
+    @staticmethod
+    async def _mock_connected(signal):
+        # Lazy signals aren't children of the device, so weren't mock-connected with it.
+        if isinstance(signal, LazySignal):
+            await signal.connect_in_background(mock=True)
+            return signal.signal
+        return signal
+
+    def _set_frames(self, frames: int) -> None:
+        self._frames = frames
+        set_mock_value(self._dae.period.good_frames, frames)
+        set_mock_value(self._dae.period.raw_frames, frames)
+
+    def _fill_spectra(self) -> None:
+        counts = self._counts_per_frame * self._frames
+        for spectrum in self._spectra:
+            set_mock_value(spectrum.counts, counts)
+            set_mock_value(spectrum.counts_size, counts.shape[0])
+
+    def _on_period_change(self, *args, **kwargs) -> None:
+        self._set_frames(0)
+        self._fill_spectra()
+
+    def _on_resume(self, *args, **kwargs) -> None:
+        if self._counting is None:
+            self._counting = asyncio.get_running_loop().create_task(self._count_frames())
+
+    def _on_pause(self, *args, **kwargs) -> None:
+        if self._counting is not None:
+            self._counting.cancel()
+            self._counting = None
+        self._fill_spectra()
+
+    async def _count_frames(self) -> None:
+        frames_per_tick = max(1, round(self._frame_rate * self._tick))
+        while True:
+            await asyncio.sleep(self._tick)
+            self._set_frames(self._frames + frames_per_tick)
+            if self._live_spectra:
+                self._fill_spectra()
@@ -0,0 +1,103 @@
+import asyncio
+import time
+from collections.abc import Awaitable, Callable, Sequence
+from dataclasses import dataclass
+from typing import Generic, TypeVar
+
+import numpy as np
+
+K = TypeVar("K")
+
+
+@dataclass
+class BulkReadStats:
+    rows: int
+    bytes: int
+    seconds: float
+    retries: int
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    @property
+    def megabytes_per_second(self) -> float:
+        return self.bytes / 1e6 / self.seconds if self.seconds else 0.0
+
+
+class BulkSpectrumReader(Generic[K]):
+    """
+    Reads many spectra into the rows of one preallocated 2D array, in the order of keys.
+
+    read_row(key) is awaited for each key, with at most max_concurrent reads in flight, issuing
+    chunk_size reads at a time so that thousands of spectra do not all get a task at once. A read
+    which raises is retried up to retries times before the whole bulk read fails.
+
+    The array is reused between reads, and only reallocated if a spectrum is longer than any seen
+    before; shorter spectra are zero-padded. allocate(shape, dtype) creates the zeroed array, so
+    it can be put somewhere other than the heap, e.g. in shared memory. Timing of the last read is
+    kept in last_stats, to help tune max_concurrent and chunk_size for an instrument.
+    """
+
+    def __init__(
+        self,
+        read_row: Callable[[K], Awaitable[np.ndarray]],
+        keys: Sequence[K],
+        *,
+        max_concurrent: int = 64,
+        chunk_size: int = 256,
+        retries: int = 2,
+        dtype=np.float64,
+        allocate: Callable[[tuple[int, int], np.dtype], np.ndarray] = np.zeros,
+    ):
+        self._read_row = read_row
+        self.keys = list(keys)
+        self._max_concurrent = max_concurrent
+        self._chunk_size = chunk_size
+        self._retries = retries
+        self._allocate = allocate
+        self.buffer = allocate((len(self.keys), 0), dtype)
+        self.last_stats: BulkReadStats | None = None
+
+    def _store_row(self, row: int, values: np.ndarray) -> None:
+        if values.shape[0] > self.buffer.shape[1]:
+            # Only happens on the first read, or if the time channels are changed.
+            grown = self._allocate((self.buffer.shape[0], values.shape[0]), self.buffer.dtype)
+            grown[:, : self.buffer.shape[1]] = self.buffer
+            self.buffer = grown
+        self.buffer[row, : values.shape[0]] = values
+        self.buffer[row, values.shape[0] :] = 0
+
+    async def _read_into(self, row: int, key: K, semaphore: asyncio.Semaphore) -> int:
+        for attempt in range(self._retries + 1):
+            try:
+                async with semaphore:
+                    values = await self._read_row(key)
+                break
+            except Exception:
+                if attempt == self._retries:
+                    raise
+        self._store_row(row, values)
+        return attempt
+
+    async def read(self) -> np.ndarray:
+        """Read every spectrum, returning the (spectrum, bin) array."""
+        semaphore = asyncio.Semaphore(self._max_concurrent)
+        start = time.perf_counter()
+        retries = 0
+        for chunk_start in range(0, len(self.keys), self._chunk_size):
+            chunk = self.keys[chunk_start : chunk_start + self._chunk_size]
+            attempts = await asyncio.gather(
+                *(
+                    self._read_into(chunk_start + offset, key, semaphore)
+                    for offset, key in enumerate(chunk)
+                )
+            )
+            retries += sum(attempts)
+        self.last_stats = BulkReadStats(
+            rows=len(self.keys),
+            bytes=self.buffer.nbytes,
+            seconds=time.perf_counter() - start,
+            retries=retries,
+        )
+        return self.buffer
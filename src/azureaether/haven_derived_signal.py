@@ -1,12 +1,22 @@
 # SOURCE: https://github.com/spc-group/haven/blob/async_ion_chamber/src/haven/instrument/signal.py
 
 import asyncio
-from typing import Callable, Mapping, Optional, Sequence, Type
+import inspect
+import logging
+import math
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import Executor
+from contextlib import contextmanager, nullcontext
+from functools import partial
+from typing import Callable, Mapping, NamedTuple, Optional, Sequence, Type
 
 import numpy as np
 from bluesky.protocols import Reading
 from ophyd_async.core import (
     DEFAULT_TIMEOUT,
+    AsyncStatus,
     SignalMetadata,
     SignalR,
     SignalRW,
@@ -14,6 +24,75 @@ from ophyd_async.core import (
     T,
 )
 
+logger = logging.getLogger(__name__)
+
+
+class InverseCacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+
+class LatencyHistogram:
+    """Log-binned histogram of call durations, in seconds."""
+
+    # Bucket upper edges from 1us to 100s, plus an overflow bucket
+    edges = tuple(10.0**exponent for exponent in range(-6, 3))
+
+    def __init__(self):
+        self.counts = [0] * (len(self.edges) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, duration: float) -> None:
+        bucket = 0
+        while bucket < len(self.edges) and duration > self.edges[bucket]:
+            bucket += 1
+        self.counts[bucket] += 1
+        self.count += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def summary(self) -> dict:
+        return {"count": self.count, "mean": self.mean, "max": self.max, "buckets": self.counts}
+
+
+class DerivedSignalTimings:
+    """Latency histograms for the phases of a derived signal's operations.
+
+    Phases are ``forward``, ``set`` (the fan-out of set points to the
+    real signals), ``read[<name>]`` (one per *derived_from* source),
+    ``inverse`` and ``callback``.
+    """
+
+    def __init__(self):
+        self.histograms = {}
+
+    def record(self, phase: str, duration: float) -> None:
+        if phase not in self.histograms:
+            self.histograms[phase] = LatencyHistogram()
+        self.histograms[phase].record(duration)
+
+    @contextmanager
+    def timer(self, phase: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(phase, time.perf_counter() - start)
+
+    def summary(self) -> dict:
+        return {phase: hist.summary() for phase, hist in self.histograms.items()}
+
+    def reset(self) -> None:
+        self.histograms.clear()
+
 
 class DerivedSignalBackend(SoftSignalBackend):
     """Links a signal to the values of one or more other signals.
@@ -35,13 +114,17 @@ class DerivedSignalBackend(SoftSignalBackend):
     argument with the value sent to this derived signal, along with
     keyword-only arguments corresponding to the signals indicated in
     *derived_from*. It should return a mapping of real signals
-    to their new values.
+    to their new values, which are all set concurrently. Alternatively
+    it may return a sequence of such mappings: each mapping is a group
+    whose signals are set one after the other, in order, while the
+    groups themselves move concurrently.
 
     *inverse()* should accept a positional argument that is a mapping
     of real signals to their read value, along with
     keyword-only arguments corresponding to the signals indicated in
     *derived_from*. It should return a new value to will be sent to
-    the derived signal.
+    the derived signal. It may also be an async function, in which
+    case it is awaited.
 
     Parameters
     ==========
@@ -53,6 +136,29 @@ class DerivedSignalBackend(SoftSignalBackend):
     inverse
       Transforms the real signal values to the derived signals'
       values.
+    coalesce_window
+      If given, monitored source updates arriving within this many
+      seconds of each other are batched, and a single recomputed
+      reading is emitted at the end of the window.
+    cache_ttl
+      If given (and *monitor_and_cache* is set), reads are answered
+      from the monitored cache when every cached reading was received
+      or refreshed within this many seconds. Only stale sources are
+      re-read.
+    executor
+      If given, a synchronous *inverse* is run in this executor
+      (typically a ``ThreadPoolExecutor``) instead of on the event
+      loop. Monitor-driven updates that arrive while an inverse is
+      running are collapsed, so only the latest values are computed.
+    memoize
+      If non-zero, remember up to this many *inverse* results, keyed
+      on the identity and timestamp of every source reading, so that
+      repeated reads of unchanged sources do not recompute. See
+      ``cache_info()`` for hit and miss counts.
+    instrument
+      If true, record latency histograms of forward, set fan-out,
+      per-source reads, inverse and callback, available from
+      ``timings``.
 
     """
 
@@ -63,6 +169,11 @@ class DerivedSignalBackend(SoftSignalBackend):
         forward: Callable | None = None,
         inverse: Callable | None = None,
         monitor_and_cache: bool = True,
+        coalesce_window: float | None = None,
+        cache_ttl: float | None = None,
+        executor: Executor | None = None,
+        memoize: int = 0,
+        instrument: bool = False,
         **kwargs,
     ):
         self._derived_from = derived_from
@@ -71,7 +182,31 @@ class DerivedSignalBackend(SoftSignalBackend):
         if inverse is not None:
             self.inverse = inverse
         self._monitor_and_cache = monitor_and_cache
+        # Incrementally maintained cache of the derived_from readings, keyed by signal, so that
+        # a single source update does not need to re-scan every other source.
         self._cached_readings = {}
+        self._cached_values = {}
+        # When each cached reading was received or refreshed (not when its value last changed)
+        self._cached_at = {}
+        self._missing_count = len(derived_from)
+        self._max_timestamp = None
+        self._max_timestamp_sig = None
+        self._severity_counts = Counter()
+        self._coalesce_window = coalesce_window
+        self._coalesce_handle = None
+        self._cache_ttl = cache_ttl
+        self._source_graph = None
+        self._executor = executor
+        self._defer_inverse = executor is not None or inspect.iscoroutinefunction(self.inverse)
+        self._inverse_task = None
+        self._inverse_pending = False
+        self._memo_size = memoize
+        self._memo = OrderedDict()
+        self._memo_hits = 0
+        self._memo_misses = 0
+        self._timings = DerivedSignalTimings() if instrument else None
+        self._source_names = {sig: key for key, sig in derived_from.items()}
+        self.put_status = None
         super().__init__(*args, **kwargs)
 
     async def forward(self, value, **kw):
@@ -84,7 +219,7 @@ class DerivedSignalBackend(SoftSignalBackend):
 
         """
         # Return the same value for the real signal as the derived signal.
-        return {key: value for key in kw.values()}
+        return dict.fromkeys(kw.values(), value)
 
     def inverse(self, values, **kw):
         """The default inverse transform for derived signals.
@@ -110,64 +245,474 @@ class DerivedSignalBackend(SoftSignalBackend):
         # Ensure dependent signals are connected
         connectors = (sig.connect(timeout=timeout) for sig in self._derived_from.values())
         await asyncio.gather(*connectors)
+        # If any source is itself derived, evaluate the whole chain with one round of reads
+        if any(_derived_backend(sig) is not None for sig in self._derived_from.values()):
+            self._source_graph = DerivedSignalGraph(self._derived_from.values(), owner=self)
         # Listen for changes in the derived_from signals
         if self._monitor_and_cache:
             for sig in self._derived_from.values():
-                sig.subscribe(self.update_readings)
+                sig.subscribe(partial(self._update_source_reading, sig))
 
     @property
     def cached_readings(self):
         if not self._monitor_and_cache:
             raise ValueError("cached_readings called when not using cache.")
-        # Like _cached_readings but with signals as keys instead of names
-        readings = self._cached_readings
-        seen_sigs = [sig for sig in self._derived_from.values() if sig.name in readings.keys()]
-        return {sig: readings[sig.name] for sig in seen_sigs}
+        return dict(self._cached_readings)
+
+    @property
+    def timings(self) -> DerivedSignalTimings | None:
+        """Latency statistics, if this backend was created with *instrument*."""
+        return self._timings
+
+    def _timed(self, phase: str):
+        return nullcontext() if self._timings is None else self._timings.timer(phase)
+
+    async def _read_source(self, sig):
+        with self._timed(f"read[{self._source_names[sig]}]"):
+            return await sig.read()
+
+    async def _get_source_value(self, sig):
+        with self._timed(f"read[{self._source_names[sig]}]"):
+            return await sig.get_value()
+
+    async def apply_inverse(self, values):
+        """Run *inverse* on *values*, in the executor or awaiting it as required."""
+        with self._timed("inverse"):
+            if self._executor is not None:
+                loop = asyncio.get_running_loop()
+                transform = partial(self.inverse, values, **self._derived_from)
+                new_value = await loop.run_in_executor(self._executor, transform)
+            else:
+                new_value = self.inverse(values, **self._derived_from)
+            if inspect.isawaitable(new_value):
+                new_value = await new_value
+        return new_value
+
+    def cache_info(self) -> InverseCacheInfo:
+        """Report statistics of the memoized inverse results."""
+        return InverseCacheInfo(
+            self._memo_hits, self._memo_misses, self._memo_size, len(self._memo)
+        )
+
+    def _memo_key(self, readings):
+        if self._memo_size == 0:
+            return None
+        return tuple(
+            (id(readings[sig]["value"]), readings[sig]["timestamp"])
+            for sig in self._derived_from.values()
+        )
 
-    def combine_readings(self, readings):
+    def _memo_lookup(self, key):
+        entry = self._memo.get(key)
+        if entry is None:
+            self._memo_misses += 1
+            return False, None
+        self._memo_hits += 1
+        self._memo.move_to_end(key)
+        return True, entry[1]
+
+    def _memo_store(self, key, values, new_value):
+        # Hold on to the source values so that their ids cannot be reused while memoized
+        self._memo[key] = (tuple(values.values()), new_value)
+        if len(self._memo) > self._memo_size:
+            self._memo.popitem(last=False)
+
+    async def _memoized_inverse(self, readings, values):
+        key = self._memo_key(readings)
+        if key is None:
+            return await self.apply_inverse(values)
+        hit, new_value = self._memo_lookup(key)
+        if not hit:
+            new_value = await self.apply_inverse(values)
+            self._memo_store(key, values, new_value)
+        return new_value
+
+    async def combine_readings(self, readings):
         timestamp = max([rd["timestamp"] for rd in readings.values()])
         severity = max([rd.get("severity", 0) for rd in readings.values()])
         values = {sig: rdg["value"] for sig, rdg in readings.items()}
-        new_value = self.inverse(values, **self._derived_from)
+        new_value = await self._memoized_inverse(readings, values)
         return self.converter.reading(new_value, timestamp, severity)
 
     def update_readings(self, reading):
+        """Stash readings keyed by signal name, as delivered by ``Signal.subscribe``."""
+        if not self._monitor_and_cache:
+            raise ValueError("update_readings called when not using cache.")
+        signals_by_name = {sig.name: sig for sig in self._derived_from.values()}
+        for name, rdg in reading.items():
+            if name in signals_by_name:
+                self._update_source_reading(signals_by_name[name], {name: rdg})
+
+    def _update_source_reading(self, sig, reading):
         if not self._monitor_and_cache:
             raise ValueError("update_readings called when not using cache.")
-        # Stash this reading
-        self._cached_readings.update(reading)
+        (rdg,) = reading.values()
+        self._stash_reading(sig, rdg)
+        if self._coalesce_window is None:
+            self._emit_cached_reading()
+        elif self._coalesce_handle is None:
+            # Open a window; further updates within it only refresh the cache.
+            loop = asyncio.get_running_loop()
+            self._coalesce_handle = loop.call_later(
+                self._coalesce_window, self._flush_coalesced_readings
+            )
+
+    def _flush_coalesced_readings(self):
+        self._coalesce_handle = None
+        self._emit_cached_reading()
+
+    def _emit_cached_reading(self):
         # Update interested parties if we have a full set of readings
-        readings = self.cached_readings
-        missing_signals = [sig for sig in self._derived_from.values() if sig not in readings.keys()]
-        if len(missing_signals) == 0:
-            # We have all the readings, so update the cached values
-            new_reading = self.combine_readings(readings)
-            if self.callback is not None:
+        if self._missing_count != 0:
+            return
+        if not self._defer_inverse:
+            key = self._memo_key(self._cached_readings)
+            hit, new_value = (False, None) if key is None else self._memo_lookup(key)
+            if not hit:
+                with self._timed("inverse"):
+                    new_value = self.inverse(self._cached_values, **self._derived_from)
+                if key is not None:
+                    self._memo_store(key, self._cached_values, new_value)
+            new_reading = self.converter.reading(
+                new_value, self._max_timestamp, self._cached_severity()
+            )
+            self._publish_reading(new_reading)
+        elif self._inverse_task is None:
+            loop = asyncio.get_running_loop()
+            self._inverse_task = loop.create_task(self._emit_deferred_readings())
+        else:
+            # Latest value wins: recompute once the running inverse finishes.
+            self._inverse_pending = True
+
+    async def _emit_deferred_readings(self):
+        try:
+            while True:
+                self._inverse_pending = False
+                try:
+                    self._publish_reading(await self._combine_cached_readings())
+                except Exception:
+                    # Nothing awaits this task, so the error would otherwise go unreported.
+                    logger.exception(
+                        "Derived signal inverse failed for sources %s", list(self._derived_from)
+                    )
+                if not self._inverse_pending:
+                    break
+        finally:
+            self._inverse_task = None
+
+    def _publish_reading(self, new_reading):
+        if self.callback is not None:
+            with self._timed("callback"):
                 self.callback(new_reading, new_reading["value"])
 
+    def _stash_reading(self, sig, rdg):
+        # Constant-time bookkeeping of missing signals, max timestamp and max severity.
+        previous = self._cached_readings.get(sig)
+        if previous is None:
+            self._missing_count -= 1
+        else:
+            self._severity_counts[previous.get("severity", 0)] -= 1
+        self._cached_readings[sig] = rdg
+        self._cached_values[sig] = rdg["value"]
+        self._cached_at[sig] = time.monotonic()
+        self._severity_counts[rdg.get("severity", 0)] += 1
+
+        timestamp = rdg["timestamp"]
+        if self._max_timestamp is None or timestamp >= self._max_timestamp:
+            self._max_timestamp = timestamp
+            self._max_timestamp_sig = sig
+        elif sig is self._max_timestamp_sig:
+            # The signal holding the max went backwards in time; rare, so just rescan.
+            self._max_timestamp_sig, latest = max(
+                self._cached_readings.items(), key=lambda item: item[1]["timestamp"]
+            )
+            self._max_timestamp = latest["timestamp"]
+
+    def _cached_severity(self):
+        return max(level for level, count in self._severity_counts.items() if count > 0)
+
+    async def _combine_cached_readings(self):
+        # Snapshot the cache, it may be updated while a deferred inverse is running
+        values = dict(self._cached_values) if self._defer_inverse else self._cached_values
+        timestamp, severity = self._max_timestamp, self._cached_severity()
+        new_value = await self._memoized_inverse(self._cached_readings, values)
+        return self.converter.reading(new_value, timestamp, severity)
+
     async def put(self, value: Optional[T], wait=True, timeout=None):
+        """Forward *value* to the real signals.
+
+        Returns an ``AsyncStatus`` tracking every real signal's set,
+        also kept as ``put_status`` (see :py:func:`derived_put_status`
+        to get it from the signal). If *wait* is false this returns as
+        soon as the sets have been started, and a failure of the sets is
+        logged. *timeout*, if not None,
+        applies to the whole fan-out; otherwise only each real
+        signal's own set timeout applies.
+
+        """
         write_value = (
             self.converter.write_value(value) if value is not None else self._initial_value
         )
         # Calculate the derived set points
-        new_values = await self.forward(write_value, **self._derived_from)
-        # Set the new values
-        await asyncio.gather(*(sig.set(val) for sig, val in new_values.items()))
+        with self._timed("forward"):
+            new_values = await self.forward(write_value, **self._derived_from)
+        # Set the new values, tracking completion of the whole fan-out
+        self.put_status = AsyncStatus(self._fan_out(new_values, timeout))
+        if wait:
+            await self.put_status
+        else:
+            self.put_status.task.add_done_callback(self._log_fan_out_failure)
+        return self.put_status
+
+    def _log_fan_out_failure(self, task):
+        # Nobody may await a put made without waiting, so the error would otherwise go unreported.
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(
+                "Derived signal put to sources %s failed",
+                list(self._derived_from),
+                exc_info=task.exception(),
+            )
+
+    async def _fan_out(self, new_values, timeout):
+        if isinstance(new_values, Mapping):
+            groups = [{sig: val} for sig, val in new_values.items()]
+        else:
+            groups = new_values
+        fan_out = asyncio.gather(*(self._set_in_order(group) for group in groups))
+        with self._timed("set"):
+            if timeout is None:
+                await fan_out
+            else:
+                await asyncio.wait_for(fan_out, timeout)
+
+    async def _set_in_order(self, group):
+        for sig, val in group.items():
+            await sig.set(val)
+
+    def _uses_cached_reads(self) -> bool:
+        return self._monitor_and_cache and self._cache_ttl is not None
+
+    async def _refresh_stale_readings(self) -> None:
+        # Re-read, in one concurrent batch, only the sources whose cached reading has expired.
+        oldest_allowed = time.monotonic() - self._cache_ttl
+        stale = [
+            sig
+            for sig in self._derived_from.values()
+            if self._cached_at.get(sig, -math.inf) < oldest_allowed
+        ]
+        if stale:
+            readings = await asyncio.gather(*(self._read_source(sig) for sig in stale))
+            for sig, reading in zip(stale, readings, strict=True):
+                self._stash_reading(sig, reading[sig.name])
 
     async def get_reading(self) -> Reading:
+        if self._uses_cached_reads():
+            await self._refresh_stale_readings()
+            return await self._combine_cached_readings()
+        if self._source_graph is not None:
+            readings = await self._source_graph.read()
+            return await self.combine_readings(
+                {sig: readings[sig] for sig in self._derived_from.values()}
+            )
         signals = self._derived_from.values()
-        readings = await asyncio.gather(*(sig.read() for sig in signals))
+        readings = await asyncio.gather(*(self._read_source(sig) for sig in signals))
         readings = {sig: reading[sig.name] for (sig, reading) in zip(signals, readings)}
         # Return a proper reading for this derived value
-        return self.combine_readings(readings)
+        return await self.combine_readings(readings)
 
     async def get_value(self) -> T:
+        if self._uses_cached_reads():
+            await self._refresh_stale_readings()
+            reading = await self._combine_cached_readings()
+            return reading["value"]
+        if self._source_graph is not None:
+            reading = await self.get_reading()
+            return reading["value"]
         # Retrieve current values from signals
-        values = {sig: (await sig.get_value()) for sig in self._derived_from.values()}
-        new_value = self.inverse(values, **self._derived_from)
+        signals = self._derived_from.values()
+        values = await asyncio.gather(*(self._get_source_value(sig) for sig in signals))
+        values = dict(zip(signals, values, strict=True))
+        new_value = await self.apply_inverse(values)
         return self.converter.value(new_value)
 
 
+class ArrayDerivedSignalBackend(DerivedSignalBackend):
+    """A derived signal backend reducing array-valued sources without temporaries.
+
+    Source values are copied into a preallocated ``(n_sources, *shape)``
+    buffer, reused for as long as the source shape and dtype stay the
+    same, and reduced along the source axis into a reused output
+    buffer. Only the returned result is a fresh array, so that
+    subscribers holding on to old values are not affected.
+
+    Parameters
+    ==========
+    reduction
+      One of ``"mean"``, ``"median"``, ``"sum"`` or ``"weighted"``.
+    weights
+      For the ``"weighted"`` reduction, a weighted mean, maps
+      transformer argument names (as in *derived_from*) to their
+      weights.
+
+    """
+
+    _reductions = ("mean", "median", "sum", "weighted")
+
+    def __init__(
+        self,
+        *args,
+        derived_from: Mapping,
+        reduction: str = "mean",
+        weights: Mapping[str, float] | None = None,
+        **kwargs,
+    ):
+        if reduction not in self._reductions:
+            raise ValueError(f"Unknown reduction {reduction!r}, expected one of {self._reductions}")
+        if reduction == "weighted":
+            if weights is None or set(weights) != set(derived_from):
+                raise ValueError("Weighted reduction needs a weight for every derived_from signal")
+            weight_values = np.array([weights[key] for key in derived_from], dtype=np.float64)
+            if weight_values.sum() == 0:
+                raise ValueError("Weights for a weighted reduction must not sum to zero")
+            # Normalized up front, so that one dot product gives the weighted mean.
+            self._weights = weight_values / weight_values.sum()
+        self._reduction = reduction
+        self._rows = {sig: row for row, sig in enumerate(derived_from.values())}
+        self._stacked = None
+        self._reduced = None
+        # The buffers may be shared between the event loop and an executor thread
+        self._buffer_lock = threading.Lock()
+        super().__init__(*args, derived_from=derived_from, **kwargs)
+
+    def _ensure_buffers(self, sample):
+        shape, dtype = np.shape(sample), np.result_type(sample, np.float64)
+        if (
+            self._stacked is None
+            or self._stacked.shape[1:] != shape
+            or self._stacked.dtype != dtype
+        ):
+            self._stacked = np.empty((len(self._rows), *shape), dtype=dtype)
+            self._reduced = np.empty(shape, dtype=dtype)
+
+    def inverse(self, values, **kw):
+        """Reduce the source values along the source axis with the configured reduction."""
+        with self._buffer_lock:
+            self._ensure_buffers(next(iter(values.values())))
+            for sig, value in values.items():
+                self._stacked[self._rows[sig]] = value
+            if self._reduction == "mean":
+                np.mean(self._stacked, axis=0, out=self._reduced)
+            elif self._reduction == "median":
+                np.median(self._stacked, axis=0, out=self._reduced)
+            elif self._reduction == "sum":
+                np.sum(self._stacked, axis=0, out=self._reduced)
+            else:
+                rows = self._stacked.reshape(len(self._rows), -1)
+                np.dot(self._weights, rows, out=self._reduced.reshape(-1))
+            return self._reduced.copy()
+
+
+def _derived_backend(signal) -> DerivedSignalBackend | None:
+    backend = getattr(signal, "_backend", None)
+    return backend if isinstance(backend, DerivedSignalBackend) else None
+
+
+def derived_put_status(signal) -> AsyncStatus | None:
+    """Return the status tracking the fan-out of the latest put to a derived *signal*.
+
+    ``signal.set(value, wait=False)`` completes once the sets of the
+    real signals have been started; this status completes when they
+    have finished. It is None if *signal* has not been put to yet.
+
+    """
+    backend = _derived_backend(signal)
+    if backend is None:
+        raise TypeError(f"{signal.name} is not a derived signal")
+    return backend.put_status
+
+
+class DerivedSignalGraph:
+    """Evaluates a set of, possibly chained, derived signals with one round of I/O.
+
+    The dependency DAG below *signals* is resolved once. On each
+    evaluation every unique non-derived leaf signal is read exactly
+    once, in a single concurrent batch, and the derived signals'
+    inverses are then applied in topological order.
+
+    Parameters
+    ==========
+    signals
+      The signals to evaluate. Derived signals are expanded into their
+      sources; any other signal is treated as a leaf.
+    owner
+      The backend deriving from *signals*, if any. Each leaf read is
+      recorded as a ``read[<name>]`` latency by every instrumented
+      backend, *owner* included, that derives directly from that leaf.
+
+    """
+
+    def __init__(self, signals, owner: DerivedSignalBackend | None = None):
+        self._leaves = []
+        self._derived = []  # Topologically sorted, dependencies first
+        visiting = set()
+        visited = set()
+
+        def visit(sig):
+            if sig in visited:
+                return
+            if sig in visiting:
+                raise ValueError(f"Cyclic dependency between derived signals at {sig.name}")
+            backend = _derived_backend(sig)
+            if backend is None:
+                self._leaves.append(sig)
+            else:
+                visiting.add(sig)
+                for source in backend._derived_from.values():
+                    visit(source)
+                visiting.discard(sig)
+                self._derived.append(sig)
+            visited.add(sig)
+
+        for sig in signals:
+            visit(sig)
+
+        # Leaf -> the timings and phase names to record its read latency under
+        self._leaf_timings = {sig: [] for sig in self._leaves}
+        backends = [_derived_backend(sig) for sig in self._derived]
+        if owner is not None:
+            backends.append(owner)
+        for backend in backends:
+            if backend._timings is None:
+                continue
+            for name, source in backend._derived_from.items():
+                if source in self._leaf_timings:
+                    self._leaf_timings[source].append((backend._timings, f"read[{name}]"))
+
+    async def _read_leaf(self, sig):
+        start = time.perf_counter()
+        reading = await sig.read()
+        duration = time.perf_counter() - start
+        for timings, phase in self._leaf_timings[sig]:
+            timings.record(phase, duration)
+        return reading
+
+    @property
+    def leaves(self) -> list:
+        return list(self._leaves)
+
+    async def read(self) -> dict:
+        """Return a mapping of every signal in the graph to its current reading."""
+        leaf_readings = await asyncio.gather(*(self._read_leaf(sig) for sig in self._leaves))
+        readings = {
+            sig: rdg[sig.name] for sig, rdg in zip(self._leaves, leaf_readings, strict=True)
+        }
+        for sig in self._derived:
+            backend = _derived_backend(sig)
+            sources = {src: readings[src] for src in backend._derived_from.values()}
+            readings[sig] = await backend.combine_readings(sources)
+        return readings
+
+
 def derived_signal_rw(
     datatype: Optional[Type[T]] = None,
     initial_value: Optional[T] = None,
@@ -178,6 +723,11 @@ def derived_signal_rw(
     units: str | None = None,
     precision: int | None = None,
     monitor_and_cache: bool = True,
+    coalesce_window: float | None = None,
+    cache_ttl: float | None = None,
+    executor: Executor | None = None,
+    memoize: int = 0,
+    instrument: bool = False,
 ) -> SignalRW[T]:
     """Creates a signal linked to one or more other signals.
 
@@ -238,6 +788,21 @@ def derived_signal_rw(
     inverse
       Transforms the real signal values to the derived signals'
       values.
+    coalesce_window
+      If given, batch monitored source updates arriving within this
+      many seconds and emit one recomputed reading per window.
+    cache_ttl
+      If given, answer reads from the monitored cache while every
+      cached reading is younger than this many seconds.
+    executor
+      If given, run a synchronous *inverse* in this executor instead
+      of on the event loop, computing only the latest values.
+    memoize
+      If non-zero, remember up to this many *inverse* results keyed on
+      the source readings' identities and timestamps.
+    instrument
+      If true, record per-phase latency histograms, available from
+      the backend's ``timings``.
 
     """
     metadata = SignalMetadata(units=units, precision=precision)
@@ -249,8 +814,15 @@ def derived_signal_rw(
         initial_value=initial_value,
         metadata=metadata,
         monitor_and_cache=monitor_and_cache,
+        coalesce_window=coalesce_window,
+        cache_ttl=cache_ttl,
+        executor=executor,
+        memoize=memoize,
+        instrument=instrument,
     )
-    signal = SignalRW(backend, name=name)
+    # No default timeout: unless set() is given one, each real signal applies its own (e.g. a
+    # motor's calculated move time), rather than the whole move being cut off at DEFAULT_TIMEOUT.
+    signal = SignalRW(backend, timeout=None, name=name)
     return signal
 
 
@@ -263,6 +835,11 @@ def derived_signal_r(
     units: str | None = None,
     precision: int | None = None,
     monitor_and_cache: bool = True,
+    coalesce_window: float | None = None,
+    cache_ttl: float | None = None,
+    executor: Executor | None = None,
+    memoize: int = 0,
+    instrument: bool = False,
 ) -> SignalR[T]:
     """Creates a signal linked to one or more other signals.
 
@@ -309,6 +886,21 @@ def derived_signal_r(
     inverse
       Transforms the real signal values to the derived signals'
       values.
+    coalesce_window
+      If given, batch monitored source updates arriving within this
+      many seconds and emit one recomputed reading per window.
+    cache_ttl
+      If given, answer reads from the monitored cache while every
+      cached reading is younger than this many seconds.
+    executor
+      If given, run a synchronous *inverse* in this executor instead
+      of on the event loop, computing only the latest values.
+    memoize
+      If non-zero, remember up to this many *inverse* results keyed on
+      the source readings' identities and timestamps.
+    instrument
+      If true, record per-phase latency histograms, available from
+      the backend's ``timings``.
 
     """
     metadata = SignalMetadata(units=units, precision=precision)
@@ -319,6 +911,66 @@ def derived_signal_r(
         initial_value=initial_value,
         metadata=metadata,
         monitor_and_cache=monitor_and_cache,
+        coalesce_window=coalesce_window,
+        cache_ttl=cache_ttl,
+        executor=executor,
+        memoize=memoize,
+        instrument=instrument,
+    )
+    signal = SignalR(backend, name=name)
+    return signal
+
+
+def array_derived_signal_r(
+    datatype: Optional[Type[T]] = None,
+    initial_value: Optional[T] = None,
+    name: str = "",
+    derived_from: Sequence = {},
+    reduction: str = "mean",
+    weights: Mapping[str, float] | None = None,
+    units: str | None = None,
+    precision: int | None = None,
+    monitor_and_cache: bool = True,
+    coalesce_window: float | None = None,
+    cache_ttl: float | None = None,
+    executor: Executor | None = None,
+    memoize: int = 0,
+    instrument: bool = False,
+) -> SignalR[T]:
+    """Creates a signal reducing several array-valued signals into one.
+
+    This is like :py:func:`derived_signal_r`, but the inverse transform
+    is a vectorized reduction along the source axis, computed in
+    reusable buffers (see :py:class:`ArrayDerivedSignalBackend`).
+
+    Parameters
+    ==========
+    derived_from
+      From which other signals does this signal derive. Maps
+      transformer arguments names to signals.
+    reduction
+      One of ``"mean"``, ``"median"``, ``"sum"`` or ``"weighted"``.
+    weights
+      Weights keyed by *derived_from* argument name, for the
+      ``"weighted"`` reduction, which is a weighted mean.
+
+    The remaining parameters are as for :py:func:`derived_signal_r`.
+
+    """
+    metadata = SignalMetadata(units=units, precision=precision)
+    backend = ArrayDerivedSignalBackend(
+        datatype,
+        derived_from=derived_from,
+        reduction=reduction,
+        weights=weights,
+        initial_value=initial_value,
+        metadata=metadata,
+        monitor_and_cache=monitor_and_cache,
+        coalesce_window=coalesce_window,
+        cache_ttl=cache_ttl,
+        executor=executor,
+        memoize=memoize,
+        instrument=instrument,
     )
     signal = SignalR(backend, name=name)
     return signal
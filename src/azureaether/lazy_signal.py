@@ -0,0 +1,39 @@
+import asyncio
+from typing import Generic
+
+from ophyd_async.core import DEFAULT_TIMEOUT, SignalR, T
+
+
+class LazySignal(Generic[T]):
+    """
+    Holds a signal which is connected on first use rather than with its parent device.
+
+    Not being a Device, a LazySignal is not a child of the device it is stored on, so
+    ensure_connected() on that device does not wait for it. connect_in_background() can be used to
+    start connecting early without waiting; reads then only wait for whatever is left. Pass it
+    mock=True to connect to a mock backend instead, as Device.connect(mock=True) would.
+    """
+
+    def __init__(self, signal: SignalR[T], timeout: float = DEFAULT_TIMEOUT):
+        self.signal = signal
+        self._timeout = timeout
+        self._connecting: asyncio.Task | None = None
+
+    def connect_in_background(self, mock: bool = False) -> asyncio.Task:
+        if self._connecting is None or (
+            self._connecting.done()
+            and (self._connecting.cancelled() or self._connecting.exception() is not None)
+        ):
+            # First use, or retry after a failed connection.
+            self._connecting = asyncio.create_task(
+                self.signal.connect(mock=mock, timeout=self._timeout)
+            )
+        return self._connecting
+
+    async def connected(self) -> SignalR[T]:
+        await self.connect_in_background()
+        return self.signal
+
+    async def get_value(self) -> T:
+        signal = await self.connected()
+        return await signal.get_value()
@@ -0,0 +1,130 @@
+import asyncio
+import math
+import multiprocessing
+import weakref
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Worker process side: the segment last attached to, kept open between calls as attaching for
+# every chunk of every point would cost more than summing a small chunk.
+_attached: shared_memory.SharedMemory | None = None
+
+
+def _sum_rows(shm_name: str, shape: tuple[int, ...], dtype: str, start: int, stop: int) -> float:
+    # Runs in a worker process: attach to the parent's buffer rather than being sent the data.
+    global _attached
+    if _attached is None or _attached.name != shm_name:
+        if _attached is not None:
+            _attached.close()
+        _attached = shared_memory.SharedMemory(name=shm_name)
+    rows = np.ndarray(shape, dtype=dtype, buffer=_attached.buf)[start:stop]
+    return float(rows.sum())
+
+
+class _Resources:
+    # Kept apart from ParallelSpectrumReduction so that a finalizer can release them.
+    def __init__(self):
+        self.pool: ProcessPoolExecutor | None = None
+        self.current: shared_memory.SharedMemory | None = None
+
+    def unlink_current(self) -> None:
+        if self.current is not None:
+            # Nothing attaches by name after this, so the name can go straight away; the memory
+            # itself is unmapped once its array has gone (see allocate()).
+            self.current.unlink()
+            self.current = None
+
+    def release(self) -> None:
+        if self.pool is not None:
+            self.pool.shutdown(wait=True, cancel_futures=True)
+            self.pool = None
+        self.unlink_current()
+
+
+class ParallelSpectrumReduction:
+    """
+    Sums contiguous groups of rows of a (spectrum, bin) array across a pool of worker processes.
+
+    The array must come from allocate(), which places it in shared memory, e.g. by passing
+    allocate to BulkSpectrumReader so that spectra are read straight into shared memory. Workers
+    attach to it by name, so nothing is copied or pickled but row ranges and partial sums. Each
+    group is split into chunks of roughly rows / workers rows, and the chunks' partial sums added
+    back up per group. For Poisson counts each group's sum is also its variance, so the partial
+    variances combine the same way.
+
+    The pool is started on first use and kept until close() (or until this object is garbage
+    collected), as starting worker processes is far slower than a reduction. Arrays from
+    allocate() stay usable after close(), but can no longer be reduced.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._resources = _Resources()
+        self._array: np.ndarray | None = None
+        weakref.finalize(self, self._resources.release)
+
+    def allocate(self, shape: tuple[int, ...], dtype=np.float64) -> np.ndarray:
+        """Return a zeroed array in a new shared memory segment, replacing the previous one."""
+        self._resources.unlink_current()
+        dtype = np.dtype(dtype)
+        size = math.prod(shape) * dtype.itemsize
+        # New segments are zero-filled.
+        shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        array = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        # The mapping must outlive the array and any views of it (which keep it alive), so only
+        # unmap once it has been collected. At exit the OS unmaps it anyway.
+        weakref.finalize(array, shm.close).atexit = False
+        self._resources.current = shm
+        self._array = array
+        return array
+
+    def _chunks(self, groups: Sequence[tuple[int, int]]) -> list[tuple[int, int, int]]:
+        total_rows = sum(stop - start for start, stop in groups)
+        chunk_rows = max(1, math.ceil(total_rows / self.workers))
+        return [
+            (group, chunk_start, min(chunk_start + chunk_rows, stop))
+            for group, (start, stop) in enumerate(groups)
+            for chunk_start in range(start, stop, chunk_rows)
+        ]
+
+    async def group_sums(
+        self, spectra: np.ndarray, groups: Sequence[tuple[int, int]]
+    ) -> list[float]:
+        """Sum spectra[start:stop] for each (start, stop) in groups."""
+        if spectra is not self._array:
+            raise ValueError("spectra must be the array last returned by allocate()")
+        if self._resources.pool is None:
+            # Spawn rather than fork, as forking a process with running threads (e.g. Channel
+            # Access) is unsafe.
+            self._resources.pool = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        shm_name = self._resources.current.name
+
+        loop = asyncio.get_running_loop()
+        chunks = self._chunks(groups)
+        partial_sums = await asyncio.gather(
+            *(
+                loop.run_in_executor(
+                    self._resources.pool,
+                    _sum_rows,
+                    shm_name,
+                    spectra.shape,
+                    spectra.dtype.str,
+                    start,
+                    stop,
+                )
+                for _, start, stop in chunks
+            )
+        )
+        sums = [0.0] * len(groups)
+        for (group, _, _), partial_sum in zip(chunks, partial_sums, strict=True):
+            sums[group] += partial_sum
+        return sums
+
+    def close(self) -> None:
+        self._array = None
+        self._resources.release()
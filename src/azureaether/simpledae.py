@@ -1,25 +1,40 @@
 import asyncio
+import math
+import time
+from collections.abc import Mapping, Sequence
+from typing import Any
 
 import bluesky.plan_stubs as bps
 import bluesky.plans as bp
+import bluesky.preprocessors as bpp
+import numpy as np
 from bluesky.callbacks import LiveTable
-from bluesky.protocols import Triggerable
+from bluesky.protocols import Movable, Preparable, Reading, Triggerable
 from ibex_bluesky_core.devices import get_pv_prefix
 from ibex_bluesky_core.devices.block import block_rw
 from ibex_bluesky_core.devices.dae.dae import Dae
 from ibex_bluesky_core.devices.dae.dae_controls import BeginRunExBits
 from ibex_bluesky_core.devices.dae.dae_spectra import DaeSpectra
 from ibex_bluesky_core.run_engine import get_run_engine
+from numpy.typing import NDArray
 from ophyd_async.core import (
     AsyncStageable,
     AsyncStatus,
     Device,
+    DeviceVector,
+    SignalRW,
     StandardReadable,
     soft_signal_r_and_setter,
     wait_for_value,
 )
+from ophyd_async.epics.signal import epics_signal_r
 from ophyd_async.plan_stubs import ensure_connected
 
+from azureaether.bulk_read import BulkSpectrumReader
+from azureaether.lazy_signal import LazySignal
+from azureaether.spectrum_archive import SpectrumArchive
+from azureaether.tof_bins import TofBinCache
+
 # TODO:
 # - Make this whole thing more pythonic, this is basically some horribly verbose java masquerading
 #   in python syntax.
@@ -50,23 +65,42 @@ class Controller(ProvidesExtraReadables):
     async def unstage(self, dae: "SimpleDae") -> None:
         """Post-scan teardown"""
 
+    async def prepare(self, dae: "SimpleDae", num_points: int) -> None:
+        """Configure the DAE for a scan of num_points points, before it is staged"""
+
+
+class PeriodPerPointController(Controller, StandardReadable):
+    """
+    Counts each point into its own DAE period, within one run.
+
+    prepare() programs the number of periods from the number of points in the scan. The time
+    spent switching period before each point is published as setup_time, so that per-point dead
+    time shows up in the data.
+    """
 
-class PeriodPerPointController(Controller):
     def __init__(self, save_run: bool):
         self._save_run = save_run
         self._current_period = 0
+        self.setup_time, self._setup_time_setter = soft_signal_r_and_setter(
+            float, 0.0, units="s", precision=4
+        )
+        super().__init__(name="")
 
     async def trigger_start(self, dae: "SimpleDae") -> None:
+        start = time.monotonic()
         self._current_period += 1
         await dae.period_num.set(self._current_period, wait=True, timeout=None)
 
         # Ensure frame counters have had a chance to reset to zero for the new period.
         # TODO: is there a nicer way to do this?
         # Something to do with https://github.com/ISISComputingGroup/IBEX/issues/8499 probably.
-        await wait_for_value(dae.period.good_frames, 0, timeout=10)
-        await wait_for_value(dae.period.raw_frames, 0, timeout=10)
+        await asyncio.gather(
+            wait_for_value(dae.period.good_frames, 0, timeout=10),
+            wait_for_value(dae.period.raw_frames, 0, timeout=10),
+        )
 
         await dae.controls.resume_run.trigger(wait=True, timeout=None)
+        self._setup_time_setter(time.monotonic() - start)
 
     async def trigger_end(self, dae: "SimpleDae") -> None:
         await dae.controls.pause_run.trigger(wait=True, timeout=None)
@@ -75,6 +109,9 @@ class PeriodPerPointController(Controller):
         self._current_period = 0
         await dae.controls.begin_run_ex.set(BeginRunExBits.BEGIN_PAUSED)
 
+    async def prepare(self, dae: "SimpleDae", num_points: int) -> None:
+        await dae.exact_number_of_periods.set(num_points)
+
     async def unstage(self, dae: "SimpleDae") -> None:
         if self._save_run:
             await dae.controls.end_run.trigger(wait=True, timeout=None)
@@ -82,7 +119,33 @@ class PeriodPerPointController(Controller):
             await dae.controls.abort_run.trigger(wait=True, timeout=None)
 
     def additional_readable_signals(self, dae: "SimpleDae") -> list[Device]:
-        return [dae.period_num]
+        return [dae.period_num, self.setup_time]
+
+
+class SpectrumCounts(Device):
+    """
+    The counts in one DAE spectrum, for strategies which read many spectra.
+
+    A cut-down DaeSpectra: only the counts and their size are connected with the parent device, so
+    each spectrum costs two PVs rather than eight. The time-of-flight bins (tof, tof_size) are
+    LazySignals, connected on first use, which is normally once per run via SimpleDae.tof_bins.
+    """
+
+    def __init__(self, *, dae_prefix: str, spectrum: int, period: int, name: str = ""):
+        prefix = f"{dae_prefix}SPEC:{period}:{spectrum}:"
+        self.counts = epics_signal_r(NDArray[np.float32], f"{prefix}YC")
+        self.counts_size = epics_signal_r(int, f"{prefix}YC.NORD")
+        self.tof = LazySignal(epics_signal_r(NDArray[np.float32], f"{prefix}X"))
+        self.tof_size = LazySignal(epics_signal_r(int, f"{prefix}X.NORD"))
+        super().__init__(name=name)
+
+    async def read_counts(self) -> NDArray[np.float32]:
+        counts, size = await asyncio.gather(self.counts.get_value(), self.counts_size.get_value())
+        return counts[:size]
+
+    async def read_tof(self) -> NDArray[np.float32]:
+        tof, size = await asyncio.gather(self.tof.get_value(), self.tof_size.get_value())
+        return tof[:size]
 
 
 class Waiter(ProvidesExtraReadables):
@@ -103,10 +166,92 @@ class PeriodGoodFramesWaiter(Waiter):
         return [dae.period.good_frames]
 
 
+class PoissonPrecisionWaiter(Waiter, StandardReadable):
+    """
+    Counts until the relative Poisson uncertainty of the intensity reaches a target precision.
+
+    The intensity is the summed counts in the detector spectra, divided by the summed counts in the
+    monitor spectra if any are given. Counting always continues to at least min_frames good frames,
+    and stops at max_frames (if given) even if the target has not been reached.
+    """
+
+    def __init__(
+        self,
+        dae_prefix: str,
+        *,
+        detector_spectra: Sequence[int],
+        target_precision: float,
+        monitor_spectra: Sequence[int] = (),
+        min_frames: int = 0,
+        max_frames: int | None = None,
+        poll_interval: float = 1.0,
+    ):
+        self.detectors = DeviceVector(
+            {
+                i: SpectrumCounts(dae_prefix=dae_prefix, spectrum=spectrum, period=0)
+                for i, spectrum in enumerate(detector_spectra)
+            }
+        )
+        self.monitors = DeviceVector(
+            {
+                i: SpectrumCounts(dae_prefix=dae_prefix, spectrum=spectrum, period=0)
+                for i, spectrum in enumerate(monitor_spectra)
+            }
+        )
+        self._target_precision = target_precision
+        self._min_frames = min_frames
+        self._max_frames = max_frames
+        self._poll_interval = poll_interval
+
+        self.relative_uncertainty, self._relative_uncertainty_setter = soft_signal_r_and_setter(
+            float, math.inf, precision=6
+        )
+        super().__init__(name="")
+
+    async def _summed_counts(self, spectra: DeviceVector) -> float:
+        counts = await asyncio.gather(*(spec.read_counts() for spec in spectra.values()))
+        return float(sum(c.sum() for c in counts))
+
+    async def _current_relative_uncertainty(self) -> float:
+        detector, monitor = await asyncio.gather(
+            self._summed_counts(self.detectors),
+            self._summed_counts(self.monitors),
+        )
+        if detector <= 0 or (len(self.monitors) > 0 and monitor <= 0):
+            return math.inf
+        # Relative variances of independent Poisson counts add for a ratio.
+        relative_variance = 1 / detector
+        if len(self.monitors) > 0:
+            relative_variance += 1 / monitor
+        return math.sqrt(relative_variance)
+
+    async def wait(self, dae: "SimpleDae"):
+        while True:
+            good_frames, relative_uncertainty = await asyncio.gather(
+                dae.period.good_frames.get_value(),
+                self._current_relative_uncertainty(),
+            )
+            self._relative_uncertainty_setter(relative_uncertainty)
+            if self._max_frames is not None and good_frames >= self._max_frames:
+                return
+            if good_frames >= self._min_frames and relative_uncertainty <= self._target_precision:
+                return
+            await asyncio.sleep(self._poll_interval)
+
+    def additional_readable_signals(self, dae: "SimpleDae") -> list[Device]:
+        return [dae.period.good_frames, self.relative_uncertainty]
+
+
 class Reducer(ProvidesExtraReadables):
     async def trigger(self, dae: "SimpleDae"):
         pass
 
+    async def stage(self, dae: "SimpleDae") -> None:
+        """Pre-scan setup, e.g. dropping anything cached from a previous run"""
+
+    async def unstage(self, dae: "SimpleDae") -> None:
+        """Post-scan teardown"""
+
 
 class SingleSpectrumByPeriodGoodFramesReducer(Reducer, StandardReadable):
     def __init__(self, dae_prefix: str, spectrum):
@@ -132,12 +277,182 @@ class SingleSpectrumByPeriodGoodFramesReducer(Reducer, StandardReadable):
         ]
 
 
-class SimpleDae(Dae, Triggerable, AsyncStageable):
+class TofRoiReducer(SingleSpectrumByPeriodGoodFramesReducer):
+    """
+    Integrates one spectrum over time-of-flight regions of interest, normalized by good frames.
+
+    The time-of-flight bins come from the DAE's run-scoped tof_bins cache and are converted into an
+    index slice for each (tof_min, tof_max) region, which is only redone if the bins change. Each
+    trigger then only reads the counts and sums the cached slices, publishing one intensity signal
+    per region in roi_intensity.
+    """
+
+    def __init__(self, dae_prefix: str, spectrum, rois: Sequence[tuple[float, float]]):
+        self._rois = list(rois)
+        self._roi_slices: list[slice] = []
+        self._roi_tof: np.ndarray | None = None
+
+        roi_signals = [soft_signal_r_and_setter(float, 0, precision=6) for _ in self._rois]
+        self.roi_intensity = DeviceVector({i: sig for i, (sig, _) in enumerate(roi_signals)})
+        self._roi_intensity_setters = [setter for _, setter in roi_signals]
+        super().__init__(dae_prefix=dae_prefix, spectrum=spectrum)
+
+    async def _get_roi_slices(self, dae: "SimpleDae") -> list[slice]:
+        tof = await dae.tof_bins.get(self.spec, self.spec.read_tof)
+        if tof is not self._roi_tof:
+            self._roi_tof = tof
+            self._roi_slices = [
+                slice(
+                    int(np.searchsorted(tof, tof_min, side="left")),
+                    int(np.searchsorted(tof, tof_max, side="right")),
+                )
+                for tof_min, tof_max in self._rois
+            ]
+        return self._roi_slices
+
+    async def trigger(self, dae: "SimpleDae"):
+        roi_slices, spec, good_frames = await asyncio.gather(
+            self._get_roi_slices(dae),
+            self.spec.read_counts(),
+            dae.period.good_frames.get_value(),
+        )
+        counts = float(spec.sum())
+        self.raw_counts_setter(counts)
+        self.intensity_setter(counts / good_frames)
+        for roi_slice, setter in zip(roi_slices, self._roi_intensity_setters, strict=True):
+            setter(float(spec[roi_slice].sum()) / good_frames)
+
+    def additional_readable_signals(self, dae: "SimpleDae") -> list[Device]:
+        return [*super().additional_readable_signals(dae), *self.roi_intensity.values()]
+
+
+class MultiSpectrumReducer(Reducer, StandardReadable):
+    """
+    Sums counts over many detector spectra and normalizes them by the summed monitor spectra.
+
+    Spectra are read by a BulkSpectrumReader with at most max_concurrent_reads reads in flight,
+    straight into one 2D (spectrum, bin) buffer which is reused across triggers, and all sums are
+    done by NumPy.
+
+    If an archive is given, every point's raw spectra (detectors then monitors) are also streamed
+    into it, along with the time-of-flight bins of the first spectrum, which are only connected
+    and read then (through SimpleDae.tof_bins). Each run goes to a new file
+    (see SpectrumArchive.new_file), so give the archive a path function to archive several runs.
+    """
+
+    def __init__(
+        self,
+        dae_prefix: str,
+        *,
+        detector_spectra: Sequence[int],
+        monitor_spectra: Sequence[int],
+        max_concurrent_reads: int = 64,
+        archive: SpectrumArchive | None = None,
+    ):
+        spectra = [*detector_spectra, *monitor_spectra]
+        self.spectra = DeviceVector(
+            {
+                i: SpectrumCounts(dae_prefix=dae_prefix, spectrum=spectrum, period=0)
+                for i, spectrum in enumerate(spectra)
+            }
+        )
+        self._n_detectors = len(detector_spectra)
+        self.bulk_reader = BulkSpectrumReader(
+            lambda row: self.spectra[row].read_counts(),
+            range(len(spectra)),
+            max_concurrent=max_concurrent_reads,
+        )
+        self._archive = archive
+
+        self.detector_counts, self._detector_counts_setter = soft_signal_r_and_setter(float, 0)
+        self.monitor_counts, self._monitor_counts_setter = soft_signal_r_and_setter(float, 0)
+        self.intensity, self._intensity_setter = soft_signal_r_and_setter(float, 0, precision=6)
+        super().__init__(name="")
+
+    async def _archive_spectra(self, dae: "SimpleDae", spectra: np.ndarray) -> None:
+        if not self._archive.has_x:
+            first = self.spectra[0]
+            self._archive.write_x(await dae.tof_bins.get(first, first.read_tof))
+        await self._archive.append(spectra)
+
+    async def trigger(self, dae: "SimpleDae"):
+        spectra = await self.bulk_reader.read()
+        if self._archive is not None:
+            await self._archive_spectra(dae, spectra)
+        per_spectrum = spectra.sum(axis=1)
+        detector = float(per_spectrum[: self._n_detectors].sum())
+        monitor = float(per_spectrum[self._n_detectors :].sum())
+        self._detector_counts_setter(detector)
+        self._monitor_counts_setter(monitor)
+        self._intensity_setter(detector / monitor if monitor else math.nan)
+
+    async def stage(self, dae: "SimpleDae") -> None:
+        if self._archive is not None:
+            self._archive.new_file()
+
+    async def unstage(self, dae: "SimpleDae") -> None:
+        if self._archive is not None:
+            await self._archive.close()
+
+    def additional_readable_signals(self, dae: "SimpleDae") -> list[Device]:
+        return [
+            self.detector_counts,
+            self.monitor_counts,
+            self.intensity,
+        ]
+
+
+class TriggerTimings(ProvidesExtraReadables, StandardReadable):
+    """
+    Publishes how long each phase of the last SimpleDae.trigger took, in seconds.
+    """
+
+    phases = ("controller_start", "waiter", "controller_end", "reducer", "total")
+
+    def __init__(self):
+        self._setters = {}
+        for phase in self.phases:
+            signal, self._setters[phase] = soft_signal_r_and_setter(
+                float, 0.0, units="s", precision=4
+            )
+            setattr(self, phase, signal)
+        super().__init__(name="")
+
+    def record(self, phase: str, duration: float) -> None:
+        self._setters[phase](duration)
+
+    async def time(self, phase: str, awaitable):
+        start = time.monotonic()
+        try:
+            return await awaitable
+        finally:
+            self.record(phase, time.monotonic() - start)
+
+    def additional_readable_signals(self, dae: "SimpleDae") -> list[Device]:
+        return [getattr(self, phase) for phase in self.phases]
+
+
+class SimpleDae(Dae, Triggerable, AsyncStageable, Preparable):
     """
     Configurable DAE with pluggable strategies for data collection, waiting, and reduction.
 
     Should cover many simple DAE use-cases, but for complex use-cases a custom Dae subclass
     may still be required to give maximum flexibility.
+
+    If pipelined, trigger() completes as soon as counting has finished and the reducer runs in
+    the background. read() waits for it, so the reduced values still land in the same event,
+    but a plan can overlap the reduction with the move to the next point (see pipelined_scan).
+
+    prepare() takes the number of points in the coming scan and passes it to the controller, so
+    that DAE configuration such as the number of periods can happen while motors move to the
+    first point.
+
+    If trigger_timings is set, the duration of each trigger phase is published as extra readable
+    signals (see TriggerTimings) so that slow points can be diagnosed from the saved data.
+
+    Strategies which need time-of-flight bins should read them through tof_bins, which keeps them
+    for the run and is cleared on stage. Call tof_bins.watch() with any time channel setting
+    signals which might change mid-run.
     """
 
     def __init__(
@@ -148,11 +463,17 @@ class SimpleDae(Dae, Triggerable, AsyncStageable):
         controller: Controller,
         waiter: Waiter,
         reducer: Reducer,
+        pipelined: bool = False,
+        trigger_timings: bool = False,
     ):
         self.prefix = prefix
         self.controller = controller
         self.waiter = waiter
         self.reducer = reducer
+        self.timings = TriggerTimings() if trigger_timings else None
+        self._pipelined = pipelined
+        self._pending_reduction: asyncio.Task | None = None
+        self.tof_bins = TofBinCache()
 
         # controller, waiter and reducer may be Devices (but they don't have to be),
         # so can define their own signals. Do __init__ after that so that those signals
@@ -163,36 +484,155 @@ class SimpleDae(Dae, Triggerable, AsyncStageable):
         # TODO - do we want to name some signal as this device's name? How to choose...?
 
         extra_readables = set()
-        for strat in [self.controller, self.waiter, self.reducer]:
+        strategies = [self.controller, self.waiter, self.reducer]
+        if self.timings is not None:
+            strategies.append(self.timings)
+        for strat in strategies:
             for sig in strat.additional_readable_signals(self):
                 extra_readables.add(sig)
 
         self.add_readables(devices=list(extra_readables))
 
+        # Made here as the DAE's own signals only exist once Dae.__init__ has run.
+        self.exact_number_of_periods = ExactSignal(self.number_of_periods)
+
+    async def _wait_for_reduction(self) -> None:
+        # The previous point's reduction must use that point's period, so it has to finish
+        # before anything moves the DAE on. Re-raises any error from the reducer.
+        if self._pending_reduction is not None:
+            reduction, self._pending_reduction = self._pending_reduction, None
+            await reduction
+
+    async def _phase(self, phase: str, awaitable):
+        if self.timings is None:
+            return await awaitable
+        return await self.timings.time(phase, awaitable)
+
+    async def _reduce(self, trigger_started: float) -> None:
+        await self._phase("reducer", self.reducer.trigger(self))
+        if self.timings is not None:
+            self.timings.record("total", time.monotonic() - trigger_started)
+
     @AsyncStatus.wrap
     async def trigger(self) -> None:
-        await self.controller.trigger_start(self)
-        await self.waiter.wait(self)
-        await self.controller.trigger_end(self)
-        await self.reducer.trigger(self)
+        await self._wait_for_reduction()
+        trigger_started = time.monotonic()
+        await self._phase("controller_start", self.controller.trigger_start(self))
+        await self._phase("waiter", self.waiter.wait(self))
+        await self._phase("controller_end", self.controller.trigger_end(self))
+        if self._pipelined:
+            self._pending_reduction = asyncio.create_task(self._reduce(trigger_started))
+        else:
+            await self._reduce(trigger_started)
+
+    async def read(self) -> dict[str, Reading]:
+        await self._wait_for_reduction()
+        return await super().read()
+
+    @AsyncStatus.wrap
+    async def prepare(self, value: int) -> None:
+        await self.controller.prepare(self, value)
 
     @AsyncStatus.wrap
     async def stage(self) -> None:
-        await self.controller.stage(self)
+        # Time channels may have changed since the last run.
+        self.tof_bins.invalidate()
+        await asyncio.gather(self.controller.stage(self), self.reducer.stage(self))
 
     @AsyncStatus.wrap
     async def unstage(self) -> None:
-        await self.controller.unstage(self)
+        try:
+            # A failed reduction which read() never collected (e.g. the plan was aborted) is
+            # raised here, but only after the run has been ended and the strategies tidied up.
+            await self._wait_for_reduction()
+        finally:
+            await asyncio.gather(self.controller.unstage(self), self.reducer.unstage(self))
+
+
+async def set_exact(values: Mapping[SignalRW, Any]) -> None:
+    """
+    Set several signals concurrently, then check all of their readbacks in one gathered read.
+
+    Raises a single OSError listing every signal which did not end up at exactly its value.
+    """
+    signals = list(values)
+    await asyncio.gather(*(sig.set(values[sig], wait=True) for sig in signals))
+    actuals = await asyncio.gather(*(sig.get_value() for sig in signals))
+    mismatches = [
+        f"Signal {sig.name} failed to set to value {values[sig]} (actual: {actual})"
+        for sig, actual in zip(signals, actuals, strict=True)
+        if values[sig] != actual
+    ]
+    if mismatches:
+        raise OSError("; ".join(mismatches))
+
+
+def set_and_check_exact(*args):
+    """
+    Plan stub: exactly set one or more signals, given as pairs like bps.mv.
 
+    e.g. set_and_check_exact(dae.number_of_periods, 15, other_signal, 2). All signals are set
+    concurrently and verified together, see set_exact.
+    """
+    if len(args) % 2 != 0:
+        raise ValueError("set_and_check_exact expects (signal, value) pairs")
+    values = dict(zip(args[::2], args[1::2], strict=True))
+    (task,) = yield from bps.wait_for([lambda: set_exact(values)])
+    # wait_for hands back the finished task without raising its error.
+    if task.exception() is not None:
+        raise task.exception()
+
+
+class ExactSignal(Device, Movable):
+    """
+    Movable wrapper around a signal which must be set exactly, e.g. a DAE setting.
+
+    set() fails with the same OSError as set_exact unless the readback matches the value, so the
+    wrapper can be used with bps.mv and friends. The wrapped signal stays named and connected by
+    its own parent; the wrapper only shares its name.
+    """
+
+    def __init__(self, signal: SignalRW):
+        self._signal = signal
+        super().__init__(name="")
+
+    @property
+    def name(self) -> str:
+        return self._signal.name
+
+    @AsyncStatus.wrap
+    async def set(self, value) -> None:
+        await set_exact({self._signal: value})
+
+
+def pipelined_scan(dae: SimpleDae, motor, positions, *, md=None):
+    """
+    Step scan which reads each point's DAE data while moving to the next point.
+
+    Use with a pipelined SimpleDae so that the reduction of one point overlaps the next move. The
+    motor is read at its own point, before the next move starts, so each event stays consistent.
+    """
 
-def set_and_check_exact(signal, value):
-    # TODO: instead of doing this at the plan level it would be better to do it at the device level.
-    # Get set() on the common dae signals which should be "exactly" settable to do this themselves.
-    # Should in principle be easy enough with a thin wrapper...
-    yield from bps.abs_set(signal, value, wait=True)
-    actual = yield from bps.rd(signal)
-    if value != actual:
-        raise IOError(f"Signal {signal.name} failed to set to value {value} (actual: {actual})")
+    @bpp.stage_decorator([dae, motor])
+    @bpp.run_decorator(md=md)
+    def inner():
+        event_open = False
+        for position in positions:
+            yield from bps.abs_set(motor, position, group="pipelined_move")
+            if event_open:
+                # Waits for the previous point's reduction while the motor moves.
+                yield from bps.read(dae)
+                yield from bps.save()
+            yield from bps.wait(group="pipelined_move")
+            yield from bps.trigger(dae, wait=True)
+            yield from bps.create()
+            yield from bps.read(motor)
+            event_open = True
+        if event_open:
+            yield from bps.read(dae)
+            yield from bps.save()
+
+    return (yield from inner())
 
 
 def plan():
@@ -218,9 +658,10 @@ def plan():
     yield from ensure_connected(dae, mot)
     num_points = 15
 
-    # TODO: should this be the responsibility of the controller instead? If so
-    # how does it get passed into the controller - via prepare() or similar?
-    yield from set_and_check_exact(dae.number_of_periods, num_points)
+    # Configure the DAE for the scan while the motor moves to the first point.
+    yield from bps.prepare(dae, num_points, group="scan_setup")
+    yield from bps.abs_set(mot, 1, group="scan_setup")
+    yield from bps.wait(group="scan_setup")
 
     yield from bp.scan([dae], mot, 1, 3, num=num_points)
 
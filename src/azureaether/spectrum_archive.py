@@ -0,0 +1,172 @@
+import ast
+import asyncio
+import queue
+import struct
+import threading
+from collections.abc import Callable
+from pathlib import Path
+
+import numpy as np
+
+_NPY_MAGIC = b"\x93NUMPY\x01\x00"
+# Fixed so that the header can be rewritten in place with the final shape on close.
+_NPY_HEADER_LENGTH = 256
+
+
+def _npy_header(shape: tuple[int, ...], dtype: np.dtype) -> bytes:
+    header = repr(
+        {
+            "descr": np.lib.format.dtype_to_descr(dtype),
+            "fortran_order": False,
+            "shape": shape,
+        }
+    )
+    # Total length must stay the same however many points get written, so pad with spaces.
+    header_size = _NPY_HEADER_LENGTH - len(_NPY_MAGIC) - 2
+    header = header.ljust(header_size - 1) + "\n"
+    if len(header) != header_size:
+        raise ValueError(f"Spectrum shape {shape} too large for archive header")
+    return _NPY_MAGIC + struct.pack("<H", header_size) + header.encode("latin1")
+
+
+class SpectrumArchive:
+    """
+    Append-only archive of every point's raw spectra, streamed to disk as a scan runs.
+
+    Points are stored as one (point, spectrum, bin) .npy file, so they can be opened with
+    np.load(path, mmap_mode="r") (see load()) and sliced by point and spectrum without reading the
+    whole file. At most max_buffered_points points are held in memory; a background thread does
+    the writing. The time-of-flight bins are stored once, alongside, in <name>_x.npy.
+
+    Each file must not already exist. new_file() moves on to the next one, e.g. for each scan, so
+    to archive more than one scan give path as a function returning a new path each time it is
+    called, rather than a fixed path.
+    """
+
+    def __init__(
+        self, path: str | Path | Callable[[], str | Path], *, max_buffered_points: int = 8
+    ):
+        self._next_path = path if callable(path) else lambda: path
+        self._queue: queue.Queue[np.ndarray | None] = queue.Queue(maxsize=max_buffered_points)
+        self._thread: threading.Thread | None = None
+        self.path: Path | None = None
+        self.x_path: Path | None = None
+        self._writer_error: Exception | None = None
+        self._point_shape: tuple[int, ...] | None = None
+        self._dtype: np.dtype | None = None
+        self._points_written = 0
+        self.has_x = False
+
+    def new_file(self) -> None:
+        """
+        Archive further points and x bins to the next path. The current file must be closed.
+
+        Raises FileExistsError if either file is already there, so that a reused path fails when
+        the run is staged rather than once counting has started.
+        """
+        if self._thread is not None:
+            raise RuntimeError(f"Spectrum archive {self.path} has not been closed")
+        path = Path(self._next_path())
+        x_path = path.with_name(f"{path.stem}_x.npy")
+        for existing in (path, x_path):
+            if existing.exists():
+                raise FileExistsError(f"Spectrum archive file {existing} already exists")
+        self.path = path
+        self.x_path = x_path
+        self._writer_error = None
+        self._point_shape = None
+        self._dtype = None
+        self._points_written = 0
+        self.has_x = False
+
+    def _open(self, point_shape: tuple[int, ...], dtype: np.dtype) -> None:
+        self._point_shape = point_shape
+        self._dtype = dtype
+        file = self.path.open("xb")
+        file.write(_npy_header((0, *point_shape), dtype))
+        self._thread = threading.Thread(
+            target=self._write_points, args=(file,), name=f"SpectrumArchive({self.path.name})"
+        )
+        self._thread.start()
+
+    def _write_points(self, file) -> None:
+        closing = False
+        try:
+            with file:
+                while (block := self._queue.get()) is not None:
+                    block.tofile(file)
+                    self._points_written += 1
+                closing = True
+                file.seek(0)
+                file.write(_npy_header((self._points_written, *self._point_shape), self._dtype))
+        except Exception as e:
+            self._writer_error = e
+            if not closing:
+                # Keep draining until close() so that appends waiting on a full queue are not stuck.
+                while self._queue.get() is not None:
+                    pass
+            # Also reported by the next append() or close(), but show it where it happened too.
+            raise
+
+    def _raise_writer_error(self) -> None:
+        if self._writer_error is not None:
+            raise OSError(f"Writing spectrum archive {self.path} failed") from self._writer_error
+
+    def write_x(self, x: np.ndarray) -> None:
+        """Store the time-of-flight bins, shared by every point."""
+        if self.path is None:
+            self.new_file()
+        np.save(self.x_path, x)
+        self.has_x = True
+
+    async def append(self, spectra: np.ndarray) -> None:
+        """Queue one point's (spectrum, bin) counts to be written, copying them."""
+        if self.path is None:
+            self.new_file()
+        self._raise_writer_error()
+        if self._thread is None:
+            self._open(spectra.shape, spectra.dtype)
+        elif spectra.shape != self._point_shape:
+            raise ValueError(
+                f"Point shape {spectra.shape} does not match archive shape {self._point_shape}"
+            )
+        block = np.array(spectra, dtype=self._dtype, copy=True)
+        try:
+            self._queue.put_nowait(block)
+        except queue.Full:
+            await asyncio.to_thread(self._queue.put, block)
+
+    async def close(self) -> None:
+        """Flush all buffered points and finalize the file's shape."""
+        if self._thread is None:
+            return
+        await asyncio.to_thread(self._queue.put, None)
+        await asyncio.to_thread(self._thread.join)
+        self._thread = None
+        self._raise_writer_error()
+
+    @staticmethod
+    def load(path: str | Path) -> tuple[np.ndarray, np.ndarray | None]:
+        """Memory-map an archive, returning its (point, spectrum, bin) counts and x bins."""
+        path = Path(path)
+        counts = np.load(path, mmap_mode="r")
+        x_path = path.with_name(f"{path.stem}_x.npy")
+        x = np.load(x_path, mmap_mode="r") if x_path.exists() else None
+        return counts, x
+
+    @staticmethod
+    def load_partial(path: str | Path) -> np.ndarray:
+        """Memory-map the points written so far of an archive which is still being written."""
+        path = Path(path)
+        with path.open("rb") as file:
+            header = file.read(_NPY_HEADER_LENGTH)[len(_NPY_MAGIC) + 2 :]
+        fields = ast.literal_eval(header.decode("latin1"))
+        dtype = np.lib.format.descr_to_dtype(fields["descr"])
+        point_shape = fields["shape"][1:]
+        point_size = dtype.itemsize * int(np.prod(point_shape))
+        points = (path.stat().st_size - _NPY_HEADER_LENGTH) // point_size
+        if points == 0:
+            return np.empty((0, *point_shape), dtype=dtype)
+        return np.memmap(
+            path, dtype=dtype, mode="r", offset=_NPY_HEADER_LENGTH, shape=(points, *point_shape)
+        )
@@ -0,0 +1,72 @@
+import asyncio
+import hashlib
+from collections.abc import Awaitable, Callable, Hashable
+
+import numpy as np
+from ophyd_async.core import SignalR
+
+
+class TofBinCache:
+    """
+    Run-scoped cache of time-of-flight bin arrays, so each spectrum's X is read once per run.
+
+    Spectra with identical binning share a single read-only array. The cache should be
+    invalidated whenever the time channels might have changed: SimpleDae does this when staged,
+    and watch() additionally invalidates it whenever a given signal (e.g. a time channel setting)
+    changes value.
+    """
+
+    def __init__(self):
+        self._by_key: dict[Hashable, np.ndarray] = {}
+        self._by_digest: dict[bytes, list[np.ndarray]] = {}
+        self._pending: dict[Hashable, asyncio.Task] = {}
+        self._generation = 0
+
+    def invalidate(self) -> None:
+        self._by_key.clear()
+        self._by_digest.clear()
+        self._pending.clear()
+        self._generation += 1
+
+    def watch(self, signal: SignalR) -> None:
+        """Invalidate the cache whenever signal changes value. signal must be connected."""
+        signal.subscribe_value(lambda _: self.invalidate())
+
+    def _deduplicate(self, bins: np.ndarray) -> np.ndarray:
+        bins = np.asarray(bins)
+        digest = hashlib.blake2b(bins.tobytes(), digest_size=16).digest()
+        candidates = self._by_digest.setdefault(digest, [])
+        for candidate in candidates:
+            if candidate.dtype == bins.dtype and np.array_equal(candidate, bins):
+                return candidate
+        shared = bins.copy()
+        shared.flags.writeable = False
+        candidates.append(shared)
+        return shared
+
+    async def _read(self, key: Hashable, read: Callable[[], Awaitable[np.ndarray]]) -> np.ndarray:
+        generation = self._generation
+        try:
+            bins = await read()
+        finally:
+            if generation == self._generation:
+                self._pending.pop(key, None)
+        if generation != self._generation:
+            # Invalidated mid-read, so these bins may be stale: don't cache them.
+            return np.asarray(bins)
+        shared = self._deduplicate(bins)
+        self._by_key[key] = shared
+        return shared
+
+    async def get(self, key: Hashable, read: Callable[[], Awaitable[np.ndarray]]) -> np.ndarray:
+        """Return the cached bins for key, calling read() to fetch them if needed."""
+        if key in self._by_key:
+            return self._by_key[key]
+        # Concurrent requests for the same spectrum share one read.
+        if key not in self._pending:
+            self._pending[key] = asyncio.create_task(self._read(key, read))
+        return await self._pending[key]
+
+    @property
+    def unique_binnings(self) -> int:
+        return sum(len(arrays) for arrays in self._by_digest.values())
@@ -1,7 +1,9 @@
 import asyncio
 import math
+from collections.abc import Sequence
 from typing import TypeVar
 
+import bluesky.plan_stubs as bps
 import bluesky.plans as bp
 import numpy as np
 import scipp as sc
@@ -18,7 +20,17 @@ from ophyd_async.core import (
 from ophyd_async.epics.signal import epics_signal_r
 from ophyd_async.plan_stubs import ensure_connected
 
-from azureaether.simpledae import SimpleDae
+from azureaether.bulk_read import BulkSpectrumReader
+from azureaether.lazy_signal import LazySignal
+from azureaether.parallel_reduce import ParallelSpectrumReduction
+from azureaether.simpledae import (
+    Controller,
+    PeriodGoodFramesWaiter,
+    PeriodPerPointController,
+    Reducer,
+    SimpleDae,
+    Waiter,
+)
 
 T = TypeVar("T")
 
@@ -28,25 +40,88 @@ def plan():
 
     class Spectrum(StandardReadable):
         def __init__(self, spec_num: int, name=""):
+            # Period 0 is the current period, so with a period per point each read holds only
+            # that point's counts.
             self.y = epics_signal_r(
-                np.typing.NDArray[np.float32], f"TE:NDW2922:DAE:SPEC:1:{spec_num}:Y"
+                np.typing.NDArray[np.float32], f"TE:NDW2922:DAE:SPEC:0:{spec_num}:Y"
             )
-            self.x = epics_signal_r(
-                np.typing.NDArray[np.float32], f"TE:NDW2922:DAE:SPEC:1:{spec_num}:X"
+            # X never changes during a run and is rarely needed, so don't make connecting the
+            # device wait for it.
+            self.x = LazySignal(
+                epics_signal_r(np.typing.NDArray[np.float32], f"TE:NDW2922:DAE:SPEC:0:{spec_num}:X")
             )
             super().__init__(name=name)
 
     class DaeWithUncertainty(SimpleDae):
-        def __init__(self, prefix: str, name: str):
-            self.nspec = 250
-            self.spec = DeviceVector({i: Spectrum(spec_num=i) for i in range(1, self.nspec + 1)})
+        def __init__(
+            self,
+            *,
+            prefix: str,
+            name: str,
+            controller: Controller,
+            waiter: Waiter,
+            monitor_spectra: Sequence[int] = range(1, 11),
+            detector_spectra: Sequence[int] = range(11, 251),
+            accumulate: bool = False,
+            reduction_workers: int | None = None,
+        ):
+            # Only the spectra which are used get PVs, and so need connecting.
+            spec_nums = [*monitor_spectra, *detector_spectra]
+            self.nmonitors = len(monitor_spectra)
+            self.spec = DeviceVector({i: Spectrum(spec_num=i) for i in spec_nums})
+
+            # For very many spectra, sum them across reduction_workers processes instead of in one
+            # thread. The spectra are then read straight into memory shared with the workers.
+            self.parallel_reduction = (
+                ParallelSpectrumReduction(reduction_workers) if reduction_workers else None
+            )
+
+            # Reads into one (spectrum, tof) array, reused across triggers. See
+            # self.spectrum_reader.last_stats for throughput when tuning the concurrency limits.
+            self.spectrum_reader = BulkSpectrumReader(
+                lambda i: self.spec[i].y.get_value(),
+                spec_nums,
+                max_concurrent=32,
+                chunk_size=128,
+                allocate=(
+                    np.zeros
+                    if self.parallel_reduction is None
+                    else self.parallel_reduction.allocate
+                ),
+            )
 
             with self.add_children_as_readables(HintedSignal):
                 self.val = soft_signal_rw(float, 0.0)
             with self.add_children_as_readables():
                 self.err = soft_signal_rw(float, 0.0)
 
-            super().__init__(prefix, name)
+            # If accumulating, val/err are per point and cumulative_val/cumulative_err are over
+            # every point since stage. Each point counts into its own period, so its sums are
+            # only new counts and can be added straight to the running totals. A controller
+            # which kept counting into one period would make every point count the same
+            # counts again, so is not allowed.
+            if accumulate and not isinstance(controller, PeriodPerPointController):
+                raise ValueError("accumulate needs a controller with a DAE period per point")
+            self._accumulate = accumulate
+            self._reset_totals()
+            if accumulate:
+                with self.add_children_as_readables():
+                    self.cumulative_val = soft_signal_rw(float, 0.0)
+                    self.cumulative_err = soft_signal_rw(float, 0.0)
+
+            # Reduction is done in trigger(), after the base reducer has run.
+            super().__init__(
+                prefix=prefix, name=name, controller=controller, waiter=waiter, reducer=Reducer()
+            )
+
+        def _reset_totals(self) -> None:
+            self._monitor_total = sc.scalar(0.0, variance=0.0)
+            self._detector_total = sc.scalar(0.0, variance=0.0)
+
+        @AsyncStatus.wrap
+        async def stage(self) -> None:
+            self._reset_totals()
+            await super().stage()
 
         @AsyncStatus.wrap
         async def trigger(self) -> None:
@@ -55,33 +130,58 @@ def plan():
 
         async def _normalize_trigger(self) -> None:
             # Read all spectra
-            spectra = await asyncio.gather(*(spec.y.get_value() for spec in self.spec.values()))
-
-            # Run normalization in a separate thread so that we don't block the main event loop
-            # if it takes a while (scipp will release the GIL during long-running ops).
-            val, err = await asyncio.to_thread(self._normalize, spectra)
-
-            await asyncio.gather(
-                self.val.set(val),
-                self.err.set(err),
-            )
-
-        def _normalize(self, values):
-            data = sc.concat(
-                [sc.array(dims=["tof"], values=v, variances=v) for v in values],
-                dim="spectrum",
-            )
-
-            monitors = data["spectrum", 0:10]
-            detectors = data["spectrum", 10 : self.nspec + 1]
+            spectra = await self.spectrum_reader.read()
+
+            if self.parallel_reduction is None:
+                # Sum in a separate thread so that we don't block the main event loop if it takes
+                # a while (NumPy releases the GIL during the sums).
+                sums = await asyncio.to_thread(self._group_sums, spectra)
+            else:
+                sums = await self.parallel_reduction.group_sums(
+                    spectra, [(0, self.nmonitors), (self.nmonitors, len(spectra))]
+                )
+            (val, err), cumulative = self._normalize(*sums)
+
+            sets = [self.val.set(val), self.err.set(err)]
+            if cumulative is not None:
+                sets += [
+                    self.cumulative_val.set(cumulative[0]),
+                    self.cumulative_err.set(cumulative[1]),
+                ]
+            await asyncio.gather(*sets)
 
-            result = sc.sum(detectors) / sc.sum(monitors)
+        @staticmethod
+        def _ratio(detectors: sc.Variable, monitors: sc.Variable) -> tuple[float, float]:
+            result = detectors / monitors
             return float(result.value), float(math.sqrt(result.variance))
 
-    dae = DaeWithUncertainty(get_pv_prefix(), "DAE")
+        def _group_sums(self, spectra) -> tuple[float, float]:
+            return float(spectra[: self.nmonitors].sum()), float(spectra[self.nmonitors :].sum())
+
+        def _normalize(self, monitor_sum: float, detector_sum: float):
+            # Counts are Poisson distributed, so each sum is also its own variance.
+            monitors = sc.scalar(monitor_sum, variance=monitor_sum)
+            detectors = sc.scalar(detector_sum, variance=detector_sum)
+
+            cumulative = None
+            if self._accumulate:
+                self._monitor_total += monitors
+                self._detector_total += detectors
+                cumulative = self._ratio(self._detector_total, self._monitor_total)
+            return self._ratio(detectors, monitors), cumulative
+
+    dae = DaeWithUncertainty(
+        prefix=get_pv_prefix(),
+        name="DAE",
+        controller=PeriodPerPointController(save_run=False),
+        waiter=PeriodGoodFramesWaiter(frames=200),
+    )
 
     yield from ensure_connected(dae, mot)
-    yield from bp.scan([dae], mot, 1, 3, 5)
+    num_points = 5
+    # One DAE period per point.
+    yield from bps.prepare(dae, num_points, wait=True)
+    yield from bp.scan([dae], mot, 1, 3, num_points)
 
 
 if __name__ == "__main__":